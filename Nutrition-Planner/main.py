@@ -2,8 +2,14 @@ import streamlit as st
 import os
 from dotenv import load_dotenv
 from google import generativeai as genai
-from fpdf import FPDF
-import base64
+import hashlib
+import json
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from cachetools import TTLCache
 
 # Load environment variables from .env file
 load_dotenv()
@@ -14,8 +20,6 @@ if not GOOGLE_API_KEY:
     st.error("Please set the GOOGLE_API_KEY in the .env file.")
     st.stop()
 
-genai.configure(api_key=GOOGLE_API_KEY)
-
 # Set up the model
 generation_config = {
     "temperature": 0.9,
@@ -37,62 +41,473 @@ safety_settings = [
     },
 ]
 
-model = genai.GenerativeModel(
-    model_name="gemini-2.0-flash",
-    generation_config=generation_config,
-    safety_settings=safety_settings,
-)
+@st.cache_resource
+def get_model():
+    """
+    Configures the Gemini client and returns the model, built once per server process.
+
+    Returns:
+        genai.GenerativeModel: The configured Gemini model.
+    """
+    genai.configure(api_key=GOOGLE_API_KEY)
+    return genai.GenerativeModel(
+        model_name="gemini-2.0-flash",
+        generation_config=generation_config,
+        safety_settings=safety_settings,
+    )
+
+# Client information fields in prompt order, as (label, user_data key)
+CLIENT_FIELDS = [
+    ("Age", "age"),
+    ("Gender", "gender"),
+    ("Height (cm)", "height_cm"),
+    ("Weight (kg)", "weight_kg"),
+    ("Activity Level", "activity_level"),
+    ("Primary Goal", "primary_goal"),
+    ("Dietary Restrictions", "dietary_restrictions"),
+    ("Food Preferences/Dislikes", "food_preferences"),
+    ("Meal Frequency", "meal_frequency"),
+    ("Snacking Habits", "snacking_habits"),
+    ("Time Constraints", "time_constraints"),
+    ("Known Allergies", "known_allergies"),
+    ("Medical Conditions", "medical_conditions"),
+    ("Diabetes Type", "diabetes_type"),
+    ("Taking Insulin", "taking_insulin"),
+    ("Taking Medication for High Blood Pressure", "taking_medication_bp"),
+    ("Taking Medication for High Cholesterol", "taking_medication_cholesterol"),
+    ("Pregnancy Trimester", "pregnancy_trimester"),
+    ("Breastfeeding Duration", "breastfeeding_duration"),
+    ("Current Medications", "current_medications"),
+    ("Meal Prep Time", "meal_prep_time"),
+    ("Cooking Skill Level", "cooking_skill"),
+    ("Kitchen Equipment", "kitchen_equipment"),
+    ("Pantry Staples", "pantry_staples"),
+]
+
+# Prompt template, filled in per request with the client information lines
+PROMPT_TEMPLATE = """
+You are a world-class nutritionist, and your task is to create a personalized one-week meal plan for a client.
+
+Client Information:
+{client_info}
+
+Instructions:
+1. Create a detailed one-week meal plan that is tailored to the client's specific needs and preferences.
+2. Ensure the meal plan is nutritionally balanced and appropriate for the client's medical conditions (if any).
+3. Consider the client's dietary restrictions, food preferences/dislikes, and meal frequency.
+4. Take into account the client's time constraints, meal prep time, cooking skill level, and available kitchen equipment.
+5. If the client has diabetes, ensure the meal plan is appropriate for their diabetes type and insulin use (if applicable).
+6. If the client has high blood pressure, ensure the meal plan is appropriate for managing their condition and medication use (if applicable).
+7. If the client has high cholesterol, ensure the meal plan is appropriate for managing their condition and medication use (if applicable).
+8. If the client is pregnant, ensure the meal plan is appropriate for their trimester.
+9. If the client is breastfeeding, ensure the meal plan is appropriate for their breastfeeding duration.
+10. Provide a variety of meals and snacks throughout the week.
+11. Provide a list of ingredients for each meal.
+12. Provide instructions for each meal.
+
+Output Format:
+Present the meal plan in a clear, day-by-day format. For each day, list the meals (breakfast, lunch, dinner, snacks) with their corresponding ingredients and instructions.
+
+Example:
+Day 1:
+Breakfast: Oatmeal with Berries and Nuts
+Ingredients: 1/2 cup rolled oats, 1 cup water, 1/4 cup mixed berries, 1 tbsp chopped nuts
+Instructions: Cook oatmeal with water. Top with berries and nuts.
+Lunch: ...
+...
+"""
+
+def format_client_info(user_data):
+    """
+    Formats the client information lines for the prompt, skipping unanswered fields.
+
+    Args:
+        user_data (dict): The user's answers.
+
+    Returns:
+        str: One "- Label: value" line per answered field.
+    """
+    lines = []
+    for label, key in CLIENT_FIELDS:
+        value = user_data.get(key)
+        if value is None or value == "" or value == []:
+            continue
+        if isinstance(value, list):
+            value = ", ".join(value)
+        lines.append(f"- {label}: {value}")
+    return "\n".join(lines)
+
+# After the first chunk, re-render the streamed meal plan every N chunks to bound Streamlit redraws
+STREAM_RENDER_EVERY = 8
+
+# Give up on a Gemini request after this many seconds instead of holding the script thread
+REQUEST_TIMEOUT = 120
+
+# Seconds between checks on a generation running in the background
+STREAM_POLL_INTERVAL = 0.1
+
+def generate_meal_plan_stream(model, prompt):
+    """
+    Sends the prompt to the Gemini API and returns the response as a stream.
+
+    Args:
+        model (genai.GenerativeModel): The model to call.
+        prompt (str): The prompt to send to the Gemini API.
+
+    Returns:
+        GenerateContentResponse: An iterable of response chunks.
+    """
+    return model.generate_content(
+        prompt, stream=True, request_options={"timeout": REQUEST_TIMEOUT}
+    )
 
-def generate_meal_plan(prompt):
+def generate_meal_plan_variants(model, prompt, num_variants):
     """
-    Sends the prompt to the Gemini API and returns the generated meal plan.
+    Requests several alternative meal plans from the Gemini API in a single call.
 
     Args:
+        model (genai.GenerativeModel): The model to call.
         prompt (str): The prompt to send to the Gemini API.
+        num_variants (int): The number of candidate plans to generate.
+
+    Returns:
+        list[str]: The generated meal plans, or None if the response was empty.
+    """
+    response = model.generate_content(
+        prompt,
+        generation_config={"candidate_count": num_variants},
+        request_options={"timeout": REQUEST_TIMEOUT},
+    )
+    meal_plans = [
+        "".join(part.text for part in c.content.parts)
+        for c in response.candidates
+        if c.content.parts
+    ]
+    return meal_plans or None
+
+def run_generation(model, prompt, num_variants, chunks):
+    """
+    Generates the meal plans; runs in a worker thread, so it must not call Streamlit.
+
+    Args:
+        model (genai.GenerativeModel): The model to call.
+        prompt (str): The prompt to send to the Gemini API.
+        num_variants (int): The number of plans to generate.
+        chunks (list[str]): Receives the text of a single plan as it streams in.
+
+    Returns:
+        list[str]: The generated meal plans, or None if the response was empty.
+    """
+    if num_variants > 1:
+        return generate_meal_plan_variants(model, prompt, num_variants)
+    for chunk in generate_meal_plan_stream(model, prompt):
+        chunks.append(chunk.text)
+    meal_plan_text = "".join(chunks)
+    return [meal_plan_text] if meal_plan_text else None
+
+# Seconds a generated meal plan is reused for identical answers
+MEAL_CACHE_TTL = 600
+
+# Generated plans are also written here so other server processes on the host can reuse them
+MEAL_CACHE_DIR = os.getenv(
+    "MEAL_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".meal_cache")
+)
+
+@st.cache_resource
+def get_meal_cache():
+    """
+    Returns the process-wide cache of generated meal plans and the lock guarding it.
+
+    Held in ``st.cache_resource`` so it survives script reruns and is shared across sessions.
+    cachetools caches are not thread-safe, so every access must hold the lock.
+    """
+    return TTLCache(maxsize=512, ttl=MEAL_CACHE_TTL), threading.Lock()
+
+def read_disk_cache(key):
+    """
+    Returns the meal plans cached on disk for ``key``.
+
+    Returns:
+        list[str]: The cached meal plans, or None if missing, expired or unreadable.
+    """
+    path = os.path.join(MEAL_CACHE_DIR, f"{key}.json")
+    try:
+        if time.time() - os.path.getmtime(path) > MEAL_CACHE_TTL:
+            os.remove(path)
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def prune_disk_cache():
+    """Deletes expired entries, and temp files left by interrupted writes, from the disk cache."""
+    cutoff = time.time() - MEAL_CACHE_TTL
+    try:
+        with os.scandir(MEAL_CACHE_DIR) as entries:
+            for entry in entries:
+                if entry.name.endswith((".json", ".tmp")) and entry.stat().st_mtime < cutoff:
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+    except OSError:
+        pass
+
+def write_disk_cache(key, meal_plans):
+    """
+    Writes the meal plans for ``key`` to the disk cache; a failed write only costs a future miss.
+
+    Expired entries are pruned on each write so the directory only holds live plans.
+    """
+    prune_disk_cache()
+    try:
+        os.makedirs(MEAL_CACHE_DIR, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=MEAL_CACHE_DIR, suffix=".tmp", delete=False
+        ) as f:
+            json.dump(meal_plans, f)
+        os.replace(f.name, os.path.join(MEAL_CACHE_DIR, f"{key}.json"))
+    except OSError:
+        pass
+
+def get_cache_key(user_data, num_variants):
+    """Returns a canonical SHA-256 hash of the user's answers and requested variant count."""
+    payload = json.dumps([user_data, num_variants], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+@st.cache_resource
+def get_generation_executor():
+    """Returns the thread pool that runs meal plan generations."""
+    return ThreadPoolExecutor(max_workers=4)
+
+@st.cache_resource
+def get_inflight_generations():
+    """
+    Returns the process-wide map of cache keys to running generations and the lock guarding it.
+
+    Each entry is a ``(future, chunks)`` pair, so a rerun or another session submitting the
+    same answers joins the running generation instead of calling the API again. Entries are
+    removed as soon as their generation finishes, whether or not a script run is still waiting.
+    """
+    return {}, threading.Lock()
+
+def get_generation(key, prompt, num_variants):
+    """
+    Returns the generation for ``key``, starting one unless it is already running.
+
+    Returns:
+        tuple: The future resolving to the meal plans, and the list the streamed text is appended to.
+    """
+    inflight, lock = get_inflight_generations()
+    meal_cache, meal_lock = get_meal_cache()
+
+    def finish(future):
+        # Runs on the worker thread, so it must not call Streamlit; the caches were fetched above
+        if future.exception() is None and future.result():
+            with meal_lock:
+                meal_cache[key] = future.result()
+            write_disk_cache(key, future.result())
+        # Retired only once its plans are cached, so no request slips between the two
+        with lock:
+            if key in inflight and inflight[key][0] is future:
+                del inflight[key]
+
+    with lock:
+        generation = inflight.get(key)
+        started = generation is None or (generation[0].done() and generation[0].exception() is not None)
+        if started:
+            chunks = []
+            future = get_generation_executor().submit(run_generation, get_model(), prompt, num_variants, chunks)
+            generation = inflight[key] = (future, chunks)
+    if started:
+        # Added outside the lock: it runs immediately if the generation has already finished
+        generation[0].add_done_callback(finish)
+    return generation
+
+def wait_for_generation(future, chunks, num_variants, placeholder):
+    """
+    Waits for a generation, streaming a single plan into ``placeholder`` as it arrives.
 
     Returns:
-        str: The generated meal plan.
+        list[str]: The generated meal plans, or None if an error occurred.
     """
+    if num_variants == 1:
+        rendered = 0
+        while not future.done():
+            # Show the first chunk as soon as it arrives, then redraw every STREAM_RENDER_EVERY chunks
+            received = len(chunks)
+            if (rendered == 0 and received) or received - rendered >= STREAM_RENDER_EVERY:
+                rendered = received
+                placeholder.markdown("".join(chunks[:rendered]))
+            time.sleep(STREAM_POLL_INTERVAL)
+    else:
+        with st.spinner(f"Generating {num_variants} meal plan variants..."):
+            wait([future])
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return future.result()
     except Exception as e:
+        placeholder.empty()
         st.error(f"An error occurred: {e}")
         return None
 
-def create_download_link(pdf_data, filename):
-    """Generates a download link for the PDF."""
-    b64 = base64.b64encode(pdf_data).decode()
-    href = f'<a href="data:application/octet-stream;base64,{b64}" download="{filename}">Download {filename}</a>'
-    return href
+def cached_generate(key, prompt, num_variants, placeholder):
+    """
+    Returns the cached meal plans for ``key``, generating and caching them on a miss.
+
+    Checks the in-memory cache, then the disk cache shared with other server processes.
+    A miss joins the running generation for ``key`` or starts one in the background, so a
+    double-click or another session with the same answers never calls the API twice. The
+    generation caches its own plans when it finishes, even if this script run was stopped.
+    A single plan is streamed into ``placeholder``; multiple variants are requested
+    together in one call. Failed generations are not cached, so the next click retries the API.
+    """
+    meal_cache, lock = get_meal_cache()
+    with lock:
+        meal_plans = meal_cache.get(key)
+    if meal_plans is None:
+        meal_plans = read_disk_cache(key)
+        if meal_plans:
+            with lock:
+                meal_cache[key] = meal_plans
+    if meal_plans is None:
+        future, chunks = get_generation(key, prompt, num_variants)
+        meal_plans = wait_for_generation(future, chunks, num_variants, placeholder)
+    return meal_plans
+
+# Typographic characters Gemini often emits, mapped to latin-1 for the PDF core fonts
+PDF_TRANSLATION = str.maketrans({
+    "\u2014": "-",    # em dash
+    "\u2013": "-",    # en dash
+    "\u2022": "*",    # bullet
+    "\u2026": "...",  # ellipsis
+    "\u2018": "'",
+    "\u2019": "'",
+    "\u201c": '"',
+    "\u201d": '"',
+})
+
+# Markdown images, inline or by reference; fpdf2 would try to download their sources
+MARKDOWN_IMAGE_RE = re.compile(r"!\[([^\]]*)\](?:\([^)]*\)|\[[^\]]*\])")
+
+def create_pdf(meal_plan_text):
+    """
+    Renders the meal plan's Markdown as a formatted PDF with headings, bold text and lists.
+
+    Args:
+        meal_plan_text (str): The generated meal plan, in Markdown.
+
+    Returns:
+        bytes: The PDF document.
+    """
+    # Imported lazily so cold starts don't pay for these until a plan is generated
+    import markdown
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Helvetica", size=12)
+    # Core fonts only cover latin-1; anything left after translation becomes "?"
+    safe_text = meal_plan_text.translate(PDF_TRANSLATION).encode("latin-1", "replace").decode("latin-1")
+    # Keep images' alt text only so fpdf never tries to fetch them
+    safe_text = MARKDOWN_IMAGE_RE.sub(r"\1", safe_text)
+    # Without the raw-HTML handlers, tags are left as text and escaped once on output,
+    # the same way code spans are, so they print as written instead of being rendered
+    md = markdown.Markdown(extensions=["sane_lists"])
+    md.preprocessors.deregister("html_block")
+    md.inlinePatterns.deregister("html")
+    pdf.write_html(md.convert(safe_text))
+    return bytes(pdf.output())
+
+@st.cache_resource
+def get_pdf_executor():
+    """Returns the thread pool that builds PDFs while the meal plans are rendered."""
+    return ThreadPoolExecutor(max_workers=2)
+
+@st.cache_resource
+def get_pdf_cache():
+    """Returns the process-wide cache of PDF builds, keyed by a hash of the meal plan text, and its lock."""
+    return TTLCache(maxsize=64, ttl=MEAL_CACHE_TTL), threading.Lock()
+
+def get_pdf_future(meal_plan_text):
+    """
+    Returns a future for the meal plan's PDF, reusing a build already started for the same text.
+
+    Args:
+        meal_plan_text (str): The generated meal plan.
+
+    Returns:
+        Future: Resolves to the PDF document as bytes.
+    """
+    pdf_cache, lock = get_pdf_cache()
+    key = hashlib.sha256(meal_plan_text.encode()).hexdigest()
+    # Held across the check and the submit so concurrent sessions share one build
+    with lock:
+        pdf_future = pdf_cache.get(key)
+        if pdf_future is None or (pdf_future.done() and pdf_future.exception() is not None):
+            pdf_future = get_pdf_executor().submit(create_pdf, meal_plan_text)
+            pdf_cache[key] = pdf_future
+    return pdf_future
+
+def show_download_button(pdf_future, filename):
+    """Renders a button that downloads the PDF once it is built, or an error if the build failed."""
+    try:
+        pdf_data = pdf_future.result()
+    except Exception as e:
+        st.error(f"Couldn't create the PDF for download: {e}")
+        return
+    st.download_button(
+        label=f"Download {filename}",
+        data=pdf_data,
+        file_name=filename,
+        mime="application/pdf",
+        key=filename,
+        # Downloading must not rerun the script, or the plan rendered on submit would disappear
+        on_click="ignore",
+    )
+
+@st.cache_resource
+def load_css():
+    """Reads the app's custom stylesheet once per server process."""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "style.css")) as f:
+        return f.read()
+
+def show_meal_plans(meal_plans, heading, placeholder):
+    """
+    Renders the generated meal plans with their PDF downloads.
+
+    Args:
+        meal_plans (list[str]): The generated meal plans, or None if generation failed.
+        heading: The ``st.empty()`` container for the results heading.
+        placeholder: The ``st.empty()`` container a single plan was streamed into.
+    """
+    if not meal_plans:
+        st.error("Failed to generate meal plan. Please try again.")
+        return
+
+    # Build the PDFs in the background while the plans are rendered
+    pdf_futures = [get_pdf_future(meal_plan_text) for meal_plan_text in meal_plans]
+
+    heading.write("🎉 Ta-da! Here's your personalized meal plan: 🎉")
+    if len(meal_plans) == 1:
+        placeholder.markdown(meal_plans[0])
+        show_download_button(pdf_futures[0], "meal_plan.pdf")
+    else:
+        tabs = st.tabs([f"Plan {i}" for i in range(1, len(meal_plans) + 1)])
+        for i, (tab, meal_plan_text, pdf_future) in enumerate(
+            zip(tabs, meal_plans, pdf_futures), start=1
+        ):
+            with tab:
+                st.markdown(meal_plan_text)
+                show_download_button(pdf_future, f"meal_plan_{i}.pdf")
 
 def main():
     """
     Main function to run the Streamlit app for the Personalized Nutrition Agent.
     """
     # --- Custom CSS ---
-    st.markdown(
-        """
-        <style>
-        .st-emotion-cache-1v0mbdj {
-            background-color: #f0f8ff; /* Light blue background */
-        }
-        .st-emotion-cache-10oheav {
-            color: #000080; /* Dark blue text */
-        }
-        .st-emotion-cache-1y4p8pa {
-            color: #000080; /* Dark blue text */
-        }
-        .st-emotion-cache-16txtl3 {
-            color: #000080; /* Dark blue text */
-        }
-        .st-emotion-cache-10trblm {
-            color: #000080; /* Dark blue text */
-        }
-        </style>
-        """,
-        unsafe_allow_html=True,
-    )
+    st.markdown(f"<style>{load_css()}</style>", unsafe_allow_html=True)
 
     # --- Title and Introduction ---
     st.title("🌟 Your Personalized Nutrition Adventure! 🌟")
@@ -105,68 +520,9 @@ def main():
     # --- Sidebar for User Input ---
     st.sidebar.header("Tell Us About You!")
 
-    # --- Basic Demographics and Goals ---
-    st.sidebar.subheader("Let's Start with the Basics")
-    age = st.sidebar.number_input("Your Age (years young!)", min_value=1, max_value=120, value=30)
-    gender = st.sidebar.selectbox("Your Gender", ["Male", "Female", "Other"])
-    height_cm = st.sidebar.number_input("Your Height (cm)", min_value=50, max_value=250, value=170)
-    weight_kg = st.sidebar.number_input("Your Weight (kg)", min_value=30, max_value=200, value=70)
-    activity_level = st.sidebar.selectbox(
-        "Your Typical Activity Level",
-        [
-            "Sedentary (mostly sitting, little to no exercise)",
-            "Lightly Active (light movement/sports 1-3 days/week)",
-            "Moderately Active (moderate exercise/sports 3-5 days/week)",
-            "Very Active (hard exercise/sports 6-7 days a week)",
-            "Extra Active (intense exercise/sports & physical job)",
-        ],
-    )
-    primary_goal = st.sidebar.selectbox(
-        "Your Main Nutrition Goal",
-        [
-            "Weight Loss (shed some pounds)",
-            "Weight Gain (bulk up)",
-            "Maintain Weight (stay steady)",
-            "Improve General Health (feel better overall)",
-            "Build Muscle (get stronger)",
-            "Muscle Definition (tone up)",
-        ],
-    )
-
-    # --- Dietary Preferences and Restrictions ---
-    st.sidebar.subheader("Your Food Preferences")
-    dietary_restrictions = st.sidebar.multiselect(
-        "Any Dietary Restrictions?",
-        [
-            "Vegetarian",
-            "Vegan",
-            "Pescatarian",
-            "Gluten-Free",
-            "Dairy-Free",
-            "Nut-Free",
-            "Soy-Free",
-            "Other",
-        ],
-    )
-    food_preferences = st.sidebar.text_input("Any Favorite Foods or Foods You Dislike?")
-    meal_frequency = st.sidebar.selectbox(
-        "How Often Do You Like to Eat?", ["3 meals a day", "4-5 smaller meals", "Other"]
-    )
-    snacking_habits = st.sidebar.selectbox(
-        "Do You Enjoy Snacking?", ["I love to snack between meals", "I don't usually snack"]
-    )
-    time_constraints = st.sidebar.multiselect(
-        "Any Time Constraints?",
-        [
-            "Limited time for breakfast",
-            "Need quick lunch options",
-            "Love cooking elaborate dinners",
-        ],
-    )
-
     # --- Health Conditions and Considerations ---
+    # Kept outside the form so each condition's follow-up questions appear as soon as it is selected
     st.sidebar.subheader("Your Health in Mind")
-    known_allergies = st.sidebar.text_input("Any Known Allergies?")
     medical_conditions = st.sidebar.multiselect(
         "Any Existing Medical Conditions?",
         [
@@ -178,60 +534,133 @@ def main():
             "Other",
         ],
     )
+    selected_conditions = frozenset(medical_conditions)
 
     # --- Diabetes Specifics ---
     diabetes_type = None
     taking_insulin = None
-    if "Diabetes" in medical_conditions:
+    if "Diabetes" in selected_conditions:
         diabetes_type = st.sidebar.selectbox("Type of Diabetes", ["Type 1", "Type 2", "Gestational", "Other"])
         taking_insulin = st.sidebar.selectbox("Are you taking insulin?", ["Yes", "No"])
         st.sidebar.write("💡 Remember: Please consult with your doctor or a registered dietitian for specific guidance on managing your diabetes.")
 
     # --- High Blood Pressure Specifics ---
     taking_medication_bp = None
-    if "High Blood Pressure" in medical_conditions:
+    if "High Blood Pressure" in selected_conditions:
         taking_medication_bp = st.sidebar.selectbox("Are you taking medication for high blood pressure?", ["Yes", "No"])
         st.sidebar.write("💡 Remember: Please consult with your doctor or a registered dietitian for specific guidance on managing your high blood pressure.")
 
     # --- High Cholesterol Specifics ---
     taking_medication_cholesterol = None
-    if "High Cholesterol" in medical_conditions:
+    if "High Cholesterol" in selected_conditions:
         taking_medication_cholesterol = st.sidebar.selectbox("Are you taking medication for high cholesterol?", ["Yes", "No"])
         st.sidebar.write("💡 Remember: Please consult with your doctor or a registered dietitian for specific guidance on managing your high cholesterol.")
 
     # --- Pregnancy Specifics ---
     pregnancy_trimester = None
-    if "Pregnancy" in medical_conditions:
+    if "Pregnancy" in selected_conditions:
         pregnancy_trimester = st.sidebar.selectbox("Pregnancy Trimester", ["First", "Second", "Third"])
         st.sidebar.write("💡 Remember: Please consult with your doctor or a registered dietitian for specific guidance on managing your diet during pregnancy.")
 
     # --- Breastfeeding Specifics ---
     breastfeeding_duration = None
-    if "Breastfeeding" in medical_conditions:
+    if "Breastfeeding" in selected_conditions:
         breastfeeding_duration = st.sidebar.selectbox("How long have you been breastfeeding?", ["Less than 6 months", "6-12 months", "More than 12 months"])
         st.sidebar.write("💡 Remember: Please consult with your doctor or a registered dietitian for specific guidance on managing your diet while breastfeeding.")
 
-    current_medications = st.sidebar.text_input("Any Current Medications? (optional)")
-
-    # --- Time Availability and Resources ---
-    st.sidebar.subheader("Your Time and Resources")
-    meal_prep_time = st.sidebar.selectbox(
-        "How Much Time Can You Dedicate to Meal Prep?", ["Minimal", "Moderate", "Significant"]
-    )
-    cooking_skill = st.sidebar.selectbox(
-        "Your Cooking Skills Level", ["Beginner", "Intermediate", "Advanced"]
-    )
-    kitchen_equipment = st.sidebar.multiselect(
-        "What Kitchen Equipment Do You Have Access To?", ["Oven", "Microwave", "Blender", "Other"]
-    )
-    pantry_staples = st.sidebar.selectbox(
-        "How's Your Pantry Stocked?", ["I have a well-stocked pantry", "I usually buy fresh ingredients"]
-    )
-
-    # --- Submit Button ---
-    if st.sidebar.button("✨ Generate My Personalized Plan! ✨"):
+    with st.sidebar.form("nutrition_form"):
+        # --- Basic Demographics and Goals ---
+        st.subheader("Let's Start with the Basics")
+        age = st.number_input("Your Age (years young!)", min_value=1, max_value=120, value=30)
+        gender = st.selectbox("Your Gender", ["Male", "Female", "Other"])
+        height_cm = st.number_input("Your Height (cm)", min_value=50, max_value=250, value=170)
+        weight_kg = st.number_input("Your Weight (kg)", min_value=30, max_value=200, value=70)
+        activity_level = st.selectbox(
+            "Your Typical Activity Level",
+            [
+                "Sedentary (mostly sitting, little to no exercise)",
+                "Lightly Active (light movement/sports 1-3 days/week)",
+                "Moderately Active (moderate exercise/sports 3-5 days/week)",
+                "Very Active (hard exercise/sports 6-7 days a week)",
+                "Extra Active (intense exercise/sports & physical job)",
+            ],
+        )
+        primary_goal = st.selectbox(
+            "Your Main Nutrition Goal",
+            [
+                "Weight Loss (shed some pounds)",
+                "Weight Gain (bulk up)",
+                "Maintain Weight (stay steady)",
+                "Improve General Health (feel better overall)",
+                "Build Muscle (get stronger)",
+                "Muscle Definition (tone up)",
+            ],
+        )
+
+        # --- Dietary Preferences and Restrictions ---
+        st.subheader("Your Food Preferences")
+        dietary_restrictions = st.multiselect(
+            "Any Dietary Restrictions?",
+            [
+                "Vegetarian",
+                "Vegan",
+                "Pescatarian",
+                "Gluten-Free",
+                "Dairy-Free",
+                "Nut-Free",
+                "Soy-Free",
+                "Other",
+            ],
+        )
+        food_preferences = st.text_input("Any Favorite Foods or Foods You Dislike?")
+        meal_frequency = st.selectbox(
+            "How Often Do You Like to Eat?", ["3 meals a day", "4-5 smaller meals", "Other"]
+        )
+        snacking_habits = st.selectbox(
+            "Do You Enjoy Snacking?", ["I love to snack between meals", "I don't usually snack"]
+        )
+        time_constraints = st.multiselect(
+            "Any Time Constraints?",
+            [
+                "Limited time for breakfast",
+                "Need quick lunch options",
+                "Love cooking elaborate dinners",
+            ],
+        )
+
+        # --- Allergies and Medications ---
+        st.subheader("A Few More Health Details")
+        known_allergies = st.text_input("Any Known Allergies?")
+        current_medications = st.text_input("Any Current Medications? (optional)")
+
+        # --- Time Availability and Resources ---
+        st.subheader("Your Time and Resources")
+        meal_prep_time = st.selectbox(
+            "How Much Time Can You Dedicate to Meal Prep?", ["Minimal", "Moderate", "Significant"]
+        )
+        cooking_skill = st.selectbox(
+            "Your Cooking Skills Level", ["Beginner", "Intermediate", "Advanced"]
+        )
+        kitchen_equipment = st.multiselect(
+            "What Kitchen Equipment Do You Have Access To?", ["Oven", "Microwave", "Blender", "Other"]
+        )
+        pantry_staples = st.selectbox(
+            "How's Your Pantry Stocked?", ["I have a well-stocked pantry", "I usually buy fresh ingredients"]
+        )
+        num_variants = st.slider("How Many Plan Variants to Compare?", 1, 4, 1)
+
+        # --- Submit Button ---
+        submitted = st.form_submit_button("✨ Generate My Personalized Plan! ✨")
+
+    if submitted:
         st.write("🚀 Crafting your personalized nutrition plan... just a moment! 🚀")
 
+        # Sort and de-duplicate multi-selects so click order doesn't change the prompt or cache key
+        dietary_restrictions = sorted(set(dietary_restrictions))
+        time_constraints = sorted(set(time_constraints))
+        medical_conditions = sorted(selected_conditions)
+        kitchen_equipment = sorted(set(kitchen_equipment))
+
         # --- Extract Data from Streamlit ---
         user_data = {
             "age": age,
@@ -247,12 +676,6 @@ def main():
             "time_constraints": time_constraints,
             "known_allergies": known_allergies,
             "medical_conditions": medical_conditions,
-            "diabetes_type": diabetes_type if "Diabetes" in medical_conditions else "N/A",
-            "taking_insulin": taking_insulin if "Diabetes" in medical_conditions else "N/A",
-            "taking_medication_bp": taking_medication_bp if "High Blood Pressure" in medical_conditions else "N/A",
-            "taking_medication_cholesterol": taking_medication_cholesterol if "High Cholesterol" in medical_conditions else "N/A",
-            "pregnancy_trimester": pregnancy_trimester if "Pregnancy" in medical_conditions else "N/A",
-            "breastfeeding_duration": breastfeeding_duration if "Breastfeeding" in medical_conditions else "N/A",
             "current_medications": current_medications,
             "meal_prep_time": meal_prep_time,
             "cooking_skill": cooking_skill,
@@ -260,83 +683,28 @@ def main():
             "pantry_staples": pantry_staples,
         }
 
-        # --- Create the Prompt ---
-        prompt = f"""
-You are a world-class nutritionist, and your task is to create a personalized one-week meal plan for a client.
-
-Client Information:
-- Age: {user_data["age"]}
-- Gender: {user_data["gender"]}
-- Height: {user_data["height_cm"]} cm
-- Weight: {user_data["weight_kg"]} kg
-- Activity Level: {user_data["activity_level"]}
-- Primary Goal: {user_data["primary_goal"]}
-- Dietary Restrictions: {user_data["dietary_restrictions"]}
-- Food Preferences/Dislikes: {user_data["food_preferences"]}
-- Meal Frequency: {user_data["meal_frequency"]}
-- Snacking Habits: {user_data["snacking_habits"]}
-- Time Constraints: {user_data["time_constraints"]}
-- Known Allergies: {user_data["known_allergies"]}
-- Medical Conditions: {user_data["medical_conditions"]}
-- Diabetes Type: {user_data["diabetes_type"]}
-- Taking Insulin: {user_data["taking_insulin"]}
-- Taking Medication for High Blood Pressure: {user_data["taking_medication_bp"]}
-- Taking Medication for High Cholesterol: {user_data["taking_medication_cholesterol"]}
-- Pregnancy Trimester: {user_data["pregnancy_trimester"]}
-- Breastfeeding Duration: {user_data["breastfeeding_duration"]}
-- Current Medications: {user_data["current_medications"]}
-- Meal Prep Time: {user_data["meal_prep_time"]}
-- Cooking Skill Level: {user_data["cooking_skill"]}
-- Kitchen Equipment: {user_data["kitchen_equipment"]}
-- Pantry Staples: {user_data["pantry_staples"]}
-
-Instructions:
-1. Create a detailed one-week meal plan that is tailored to the client's specific needs and preferences.
-2. Ensure the meal plan is nutritionally balanced and appropriate for the client's medical conditions (if any).
-3. Consider the client's dietary restrictions, food preferences/dislikes, and meal frequency.
-4. Take into account the client's time constraints, meal prep time, cooking skill level, and available kitchen equipment.
-5. If the client has diabetes, ensure the meal plan is appropriate for their diabetes type and insulin use (if applicable).
-6. If the client has high blood pressure, ensure the meal plan is appropriate for managing their condition and medication use (if applicable).
-7. If the client has high cholesterol, ensure the meal plan is appropriate for managing their condition and medication use (if applicable).
-8. If the client is pregnant, ensure the meal plan is appropriate for their trimester.
-9. If the client is breastfeeding, ensure the meal plan is appropriate for their breastfeeding duration.
-10. Provide a variety of meals and snacks throughout the week.
-11. Provide a list of ingredients for each meal.
-12. Provide instructions for each meal.
-
-Output Format:
-Present the meal plan in a clear, day-by-day format. For each day, list the meals (breakfast, lunch, dinner, snacks) with their corresponding ingredients and instructions.
+        # Condition specifics are only asked for selected conditions; the rest are left out of the prompt
+        condition_details = {
+            "diabetes_type": diabetes_type,
+            "taking_insulin": taking_insulin,
+            "taking_medication_bp": taking_medication_bp,
+            "taking_medication_cholesterol": taking_medication_cholesterol,
+            "pregnancy_trimester": pregnancy_trimester,
+            "breastfeeding_duration": breastfeeding_duration,
+        }
+        user_data.update({k: v for k, v in condition_details.items() if v is not None})
 
-Example:
-Day 1:
-Breakfast: Oatmeal with Berries and Nuts
-Ingredients: 1/2 cup rolled oats, 1 cup water, 1/4 cup mixed berries, 1 tbsp chopped nuts
-Instructions: Cook oatmeal with water. Top with berries and nuts.
-Lunch: ...
-...
-"""
+        # --- Create the Prompt ---
+        prompt = PROMPT_TEMPLATE.format(client_info=format_client_info(user_data))
 
         #st.text_area("Generated Prompt:", value=prompt, height=400)
 
         # --- Generate Meal Plan using Gemini API ---
-        with st.spinner("Generating your personalized meal plan..."):
-            meal_plan_text = generate_meal_plan(prompt)
-
-        if meal_plan_text:
-            st.write("🎉 Ta-da! Here's your personalized meal plan: 🎉")
-            st.markdown(meal_plan_text)
-
-            # --- Create PDF ---
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", size=12)
-            pdf.multi_cell(0, 10, meal_plan_text)
-            pdf_data = pdf.output(dest="S").encode("latin-1")
-
-            # --- Download Button ---
-            st.markdown(create_download_link(pdf_data, "meal_plan.pdf"), unsafe_allow_html=True)
-        else:
-            st.error("Failed to generate meal plan. Please try again.")
+        cache_key = get_cache_key(user_data, num_variants)
+        heading = st.empty()
+        placeholder = st.empty()
+        meal_plans = cached_generate(cache_key, prompt, num_variants, placeholder)
+        show_meal_plans(meal_plans, heading, placeholder)
 
     # --- Disclaimer ---
     st.markdown(
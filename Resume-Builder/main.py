@@ -2,11 +2,28 @@ import streamlit as st
 import os
 from dotenv import load_dotenv
 from google import generativeai as genai
-from fpdf import FPDF
-import base64
+from google.generativeai import caching
+from reportlab.lib.pagesizes import LETTER
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from xml.sax.saxutils import escape
+import io
 import re
+import string
+import hashlib
+import json
 import logging
-from typing import Optional, List, Tuple
+import time
+import datetime
+import pickle
+import tempfile
+import threading
+import numpy as np
+from typing import Optional, List, Tuple, Callable
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,38 +36,300 @@ load_dotenv()
 MAX_SKILLS = 10
 VALID_FILE_TYPES = ["pdf", "docx", "txt"]
 DEFAULT_TEMPERATURE = 0.7
+MODEL_NAME = "gemini-1.5-flash"
+RESPONSE_CACHE_SIZE = 512
+RESPONSE_CACHE_TTL = 3600  # seconds
+# Explicit context caches need a versioned model and at least 32,768 tokens of context.
+# At ~4 characters per token that is roughly 130k characters of resume plus job description,
+# so only unusually large inputs are cached; everything else is sent inline.
+CONTEXT_CACHE_MODEL = f"models/{MODEL_NAME}-002"
+CONTEXT_CACHE_MIN_CHARS = 32768 * 4
+CONTEXT_CACHE_TTL = 3600  # seconds
+# Batch jobs are billed at half price but may take minutes to complete
+BATCH_POLL_INTERVAL = 10  # seconds
+BATCH_TIMEOUT = 900  # seconds
+BATCH_TERMINAL_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+# Batch runs cannot pause for skill selection, so the model picks the focus itself
+BATCH_SKILLS_FOCUS = "the 5 most critical skills required by the target job description"
+# Skills are reused for job descriptions whose embeddings are at least this similar
+SKILL_CACHE_PATH = os.getenv(
+    "SKILL_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "resume_builder", "skills.pkl")
+)
+SKILL_CACHE_MAX_ENTRIES = 1000
+SKILL_CACHE_SIMILARITY = 0.92
+EMBEDDING_MODEL = "models/gemini-embedding-001"
+EMBEDDING_DIMENSIONS = 768
+# Unicode TTF fonts tried for PDFs, falling back to Helvetica (latin-1 only)
+PDF_FONT_PATHS = [
+    os.getenv("PDF_FONT_PATH", ""),
+    "DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/Library/Fonts/DejaVuSans.ttf",
+]
+# Numbered list item such as "3. Python"
+_SKILL_LINE_RE = re.compile(r'^\s*\d+\.\s*(.+?)\s*$')
+# Skills sections and their bullets, for extracting skills without the model.
+# A heading is a short line such as "## Requirements", "**Minimum Qualifications:**" or "Skills & Experience".
+_SKILLS_HEADING_RE = re.compile(
+    r'(?i)^\s*(?:#{1,6}\s+|>\s*)?[*_]*\s*'
+    r'(?:(?:minimum|basic|preferred|required|key|core|technical|essential|desired|additional|must[- ]have)\s+)*'
+    r'(?:skills|requirements|qualifications)'
+    r'(?:\s*(?:&|and)\s*(?:skills|requirements|qualifications|experience))?'
+    r'\s*:?\s*[*_]*\s*:?\s*$'
+)
+_BULLET_RE = re.compile(r'^\s*(?:[-•*▪◦●]|\d+[.)])\s+(.+?)[\s.;]*$')
+
+# Prompt skeletons, built once and filled in per request
+_SKILLS_PROMPT = string.Template("""
+Analyze the following job description and extract exactly the top ${max_skills} most critical skills 
+that candidates must possess, ordered by importance. Focus on:
+
+1. Technical/hard skills specific to the role
+2. Industry-specific knowledge
+3. Key soft skills mentioned
+4. Tools/technologies required
+
+Present ONLY as a numbered list (1-${max_skills}) without additional commentary.
+
+Job Description:
+${job_description}
+""")
+
+_RESUME_PROMPT = string.Template("""
+Role: Expert Resume Writer specializing in ATS-optimized resumes
+
+Task: Transform this resume to perfectly match the target job by emphasizing ${skills_focus}
+
+Guidelines:
+1. STRUCTURE: Use standard resume sections (Summary, Skills, Experience, Education)
+2. RELEVANCE: Prioritize experiences demonstrating selected skills
+3. QUANTIFICATION: Add metrics to achievements where possible
+4. KEYWORDS: Mirror language from the job description
+5. CONCISENESS: Keep to 1-2 pages worth of content
+6. FORMATTING: Use clean, professional formatting with bullet points
+
+${documents}
+
+Generate the optimized resume following these exact sections:
+
+[Professional Summary]
+- 3-4 sentence career overview highlighting top qualifications
+
+[Key Skills]
+- 6-8 bullet points mixing selected skills and job keywords
+
+[Professional Experience]
+- For each role:
+  - Company, Job Title, Dates
+  - 3-5 bullet points emphasizing relevant achievements
+  - Start bullets with strong action verbs
+  - Include metrics (%, $$, numbers) where possible
+
+[Education]
+- Degree, Institution, Year
+- Relevant coursework if entry-level
+
+[Optional Sections]
+- Certifications, Projects, or Technical Skills if space allows
+""")
+
+_COVER_LETTER_PROMPT = string.Template("""
+Role: Expert Cover Letter Writer specializing in ATS-optimized cover letters
+
+Task: Craft a compelling cover letter to perfectly match the target job by emphasizing ${skills_focus}
+
+Guidelines:
+1. STRUCTURE: Use standard cover letter format (Introduction, Body, Conclusion)
+2. RELEVANCE: Prioritize experiences demonstrating selected skills
+3. QUANTIFICATION: Add metrics to achievements where possible
+4. KEYWORDS: Mirror language from the job description
+5. CONCISENESS: Keep to 1 page worth of content
+6. FORMATTING: Use clean, professional formatting with paragraphs
+7. PERSONALIZATION: Address the recipient by name and mention the company name
+
+${documents}
+
+Company Name:
+${company_name}
+
+Recipient Name:
+${recipient_name}
+
+Generate the optimized cover letter following these exact sections:
+
+[Introduction]
+- Express enthusiasm for the role and company
+- Briefly introduce yourself and highlight your key qualifications
+
+[Body]
+- 2-3 paragraphs detailing relevant experiences and achievements
+- Emphasize how your skills align with the job requirements
+- Use specific examples and metrics to showcase your impact
+
+[Conclusion]
+- Reiterate your interest and enthusiasm
+- Thank the recipient for their time and consideration
+- Express your eagerness to discuss your application further
+
+""")
+
+GENERATION_CONFIG = {
+    "temperature": float(os.getenv("MODEL_TEMPERATURE", DEFAULT_TEMPERATURE)),
+    "max_output_tokens": 4096,
+}
+
+# A numbered list of MAX_SKILLS items is short; keep it near-deterministic
+SKILLS_GENERATION_CONFIG = {
+    **GENERATION_CONFIG,
+    "top_p": 1,
+    "top_k": 1,
+    "max_output_tokens": 256,
+}
+
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+]
+
+@st.cache_resource
+def _get_gemini_model(api_key: str) -> genai.GenerativeModel:
+    """Configure the Gemini API once per process and share the model across reruns and user sessions."""
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(
+        model_name=MODEL_NAME,
+        generation_config=GENERATION_CONFIG,
+        safety_settings=SAFETY_SETTINGS,
+    )
+
+@st.cache_resource
+def _get_pdf_font() -> str:
+    """Register the first available Unicode font with reportlab and return its name."""
+    for path in filter(None, PDF_FONT_PATHS):
+        try:
+            pdfmetrics.registerFont(TTFont("DejaVuSans", path))
+            return "DejaVuSans"
+        except Exception:
+            continue
+    logger.warning("No Unicode font found for PDFs, non-latin characters may not render")
+    return "Helvetica"
+
+@st.cache_resource
+def _get_executor() -> ThreadPoolExecutor:
+    """Process-wide worker pool for running independent Gemini calls concurrently."""
+    return ThreadPoolExecutor(max_workers=4)
+
+@st.cache_resource
+def _get_response_cache() -> Tuple[TTLCache, threading.Lock]:
+    """
+    Process-wide cache of Gemini responses, shared across reruns and user sessions.
+    cachetools caches are not thread-safe, so every access must hold the returned lock.
+    """
+    return TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL), threading.Lock()
+
+class SkillCache:
+    """
+    Skills extracted per job description, persisted to disk.
+    Looks up exact matches by hash, then near-duplicates by embedding cosine similarity.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._exact = {}
+        self._skills = []
+        self._embeddings = np.empty((0, EMBEDDING_DIMENSIONS), dtype=np.float32)
+        self._load()
+
+    def _load(self) -> None:
+        """Load the cache from disk; a missing or unreadable file starts it empty."""
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+            self._exact = data["exact"]
+            self._skills = data["skills"]
+            self._embeddings = data["embeddings"]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable skill cache {self.path}: {str(e)}")
+
+    def _save(self) -> None:
+        """Write the cache atomically; a failed write only costs future misses."""
+        try:
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            with tempfile.NamedTemporaryFile("wb", dir=directory, suffix=".tmp", delete=False) as f:
+                pickle.dump({"exact": self._exact, "skills": self._skills, "embeddings": self._embeddings}, f)
+            os.replace(f.name, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save skill cache: {str(e)}")
+
+    @staticmethod
+    def _embed(text: str) -> Optional[np.ndarray]:
+        """Unit-length embedding of the text, or None if the embedding call fails."""
+        try:
+            result = genai.embed_content(
+                model=EMBEDDING_MODEL,
+                content=text,
+                task_type="SEMANTIC_SIMILARITY",
+                output_dimensionality=EMBEDDING_DIMENSIONS,
+            )
+        except Exception as e:
+            logger.warning(f"Embedding failed, skipping semantic skill cache: {str(e)}")
+            return None
+        embedding = np.asarray(result["embedding"], dtype=np.float32)
+        return embedding / np.linalg.norm(embedding)
+
+    def lookup(self, key: str, job_description: str) -> Tuple[Optional[List[str]], Optional[np.ndarray]]:
+        """
+        Return cached skills for the job description and its embedding.
+        The embedding is None on an exact hit and is passed back to store() on a miss.
+        """
+        with self._lock:
+            skills = self._exact.get(key)
+        if skills is not None:
+            return list(skills), None
+
+        embedding = self._embed(job_description)
+        if embedding is None:
+            return None, None
+
+        with self._lock:
+            if len(self._skills):
+                # Rows are unit length, so the dot product is the cosine similarity
+                scores = self._embeddings @ embedding
+                best = int(np.argmax(scores))
+                if scores[best] >= SKILL_CACHE_SIMILARITY:
+                    self._exact[key] = self._skills[best]
+                    return list(self._skills[best]), embedding
+        return None, embedding
+
+    def store(self, key: str, skills: List[str], embedding: Optional[np.ndarray]) -> None:
+        """Cache skills for a job description, evicting the oldest entries beyond the size limit."""
+        with self._lock:
+            self._exact[key] = skills
+            while len(self._exact) > SKILL_CACHE_MAX_ENTRIES:
+                del self._exact[next(iter(self._exact))]
+            if embedding is not None:
+                self._skills.append(skills)
+                self._embeddings = np.vstack([self._embeddings, embedding])[-SKILL_CACHE_MAX_ENTRIES:]
+                self._skills = self._skills[-SKILL_CACHE_MAX_ENTRIES:]
+            self._save()
+
+@st.cache_resource
+def _get_skill_cache() -> SkillCache:
+    """Process-wide skill cache, loaded from disk once."""
+    return SkillCache(SKILL_CACHE_PATH)
 
 class ResumeBuilder:
     def __init__(self):
-        self._configure_gemini()
-        
-    def _configure_gemini(self) -> None:
-        """Configure the Gemini API with settings from environment variables."""
         self.GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
         if not self.GOOGLE_API_KEY:
             raise ValueError("GOOGLE_API_KEY not found in environment variables")
-        
-        genai.configure(api_key=self.GOOGLE_API_KEY)
-        
-        self.generation_config = {
-            "temperature": float(os.getenv("MODEL_TEMPERATURE", DEFAULT_TEMPERATURE)),
-            "top_p": 1,
-            "top_k": 1,
-            "max_output_tokens": 4096,
-        }
-
-        self.safety_settings = [
-            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        ]
-
-        self.model = genai.GenerativeModel(
-            model_name="gemini-1.5-flash",
-            generation_config=self.generation_config,
-            safety_settings=self.safety_settings,
-        )
+        self.model = _get_gemini_model(self.GOOGLE_API_KEY)
 
     @staticmethod
     def _sanitize_input(text: str) -> str:
@@ -59,18 +338,116 @@ class ResumeBuilder:
             return ""
         return text.strip()
 
-    def _generate_content(self, prompt: str) -> Optional[str]:
-        """Handle content generation with error management."""
+    @staticmethod
+    def _format_documents(resume: str, job_description: str) -> str:
+        """Format the resume and job description shared by the resume and cover letter prompts."""
+        return f"Original Resume:\n{resume}\n\nTarget Job Description:\n{job_description}"
+
+    def prime_cache(self, documents: str) -> Optional[caching.CachedContent]:
+        """
+        Upload the formatted resume and job description as a Gemini context cache.
+        Returns None when the documents are below CONTEXT_CACHE_MIN_CHARS (the usual case) or caching fails,
+        in which case callers send the documents inline. The cache expires on its own after CONTEXT_CACHE_TTL.
+        """
+        if len(documents) < CONTEXT_CACHE_MIN_CHARS:
+            return None
         try:
-            response = self.model.generate_content(prompt)
-            if not response.text:
-                logger.error("Empty response from Gemini API")
-                return None
-            return response.text
+            return caching.CachedContent.create(
+                model=CONTEXT_CACHE_MODEL,
+                contents=[documents],
+                ttl=datetime.timedelta(seconds=CONTEXT_CACHE_TTL),
+            )
+        except Exception as e:
+            logger.warning(f"Context caching failed, sending documents inline: {str(e)}")
+            return None
+
+    @staticmethod
+    def _documents_section(documents: str, cached_content: Optional[caching.CachedContent]) -> str:
+        """Documents to embed in the prompt, or a pointer to them when they are in the context cache."""
+        if cached_content is not None:
+            return "The original resume and target job description are provided in the cached context."
+        return documents
+
+    def _cache_key(self, prompt: str, cached_content: Optional[caching.CachedContent] = None,
+                   generation_config: Optional[dict] = None) -> str:
+        """Hash the prompt together with the settings and context that affect the response."""
+        context = cached_content.name if cached_content is not None else ""
+        config = json.dumps(generation_config or GENERATION_CONFIG, sort_keys=True)
+        payload = f"{MODEL_NAME}\x00{config}\x00{context}\x00{prompt}"
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _get_model(self, cached_content: Optional[caching.CachedContent] = None) -> genai.GenerativeModel:
+        """Model bound to the context cache when one is given, otherwise the shared model."""
+        if cached_content is None:
+            return self.model
+        return genai.GenerativeModel.from_cached_content(
+            cached_content,
+            generation_config=GENERATION_CONFIG,
+            safety_settings=SAFETY_SETTINGS,
+        )
+
+    def _request_text(self, prompt: str, cached_content: Optional[caching.CachedContent] = None,
+                      generation_config: Optional[dict] = None,
+                      on_text: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Call Gemini and return the response text, streaming the text so far to on_text when given.
+        Raises on API errors and empty responses. Makes no Streamlit calls itself, so it can run on a worker thread.
+        """
+        model = self._get_model(cached_content)
+        if on_text is None:
+            text = model.generate_content(prompt, generation_config=generation_config).text
+        else:
+            text = ""
+            for chunk in model.generate_content(prompt, generation_config=generation_config, stream=True):
+                text += chunk.text
+                on_text(text)
+        if not text:
+            raise ValueError("Empty response from Gemini API")
+        return text
+
+    @staticmethod
+    def _cached_response(key: str) -> Optional[str]:
+        """Look up a response in the process-wide cache."""
+        cache, lock = _get_response_cache()
+        with lock:
+            cached = cache.get(key)
+        if cached is not None:
+            logger.info("Serving Gemini response from cache")
+        return cached
+
+    @staticmethod
+    def _finish_request(key: str, request: Callable[[], str]) -> Optional[str]:
+        """
+        Run request on the script thread, caching its text under key.
+        Returns None and reports the error in the UI if it failed.
+        """
+        try:
+            text = request()
         except Exception as e:
             logger.error(f"Error generating content: {str(e)}")
-            st.error(f"An error occurred while generating content. Please try again.")
+            st.error("An error occurred while generating content. Please try again.")
             return None
+        cache, lock = _get_response_cache()
+        with lock:
+            cache[key] = text
+        return text
+
+    def _generate_content(self, prompt: str, cached_content: Optional[caching.CachedContent] = None,
+                          generation_config: Optional[dict] = None,
+                          on_text: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        Handle content generation with error management, serving repeated prompts from cache.
+        generation_config replaces the default generation settings for this call.
+        When on_text is given the response is streamed and on_text receives the text so far after each chunk.
+        Returns the full text, or None if the call failed or was cut short.
+        """
+        key = self._cache_key(prompt, cached_content, generation_config)
+        cached = self._cached_response(key)
+        if cached is not None:
+            return cached
+        return self._finish_request(
+            key, lambda: self._request_text(prompt, cached_content, generation_config, on_text)
+        )
 
     def extract_skills(self, job_description: str) -> Optional[List[str]]:
         """
@@ -81,164 +458,291 @@ class ResumeBuilder:
         if not sanitized_jd:
             return None
 
-        prompt = f"""
-        Analyze the following job description and extract exactly the top {MAX_SKILLS} most critical skills 
-        that candidates must possess, ordered by importance. Focus on:
-        
-        1. Technical/hard skills specific to the role
-        2. Industry-specific knowledge
-        3. Key soft skills mentioned
-        4. Tools/technologies required
-        
-        Present ONLY as a numbered list (1-{MAX_SKILLS}) without additional commentary.
-        
-        Job Description:
-        {sanitized_jd}
-        """
+        skills = _fast_extract_skills(sanitized_jd)
+        if skills:
+            logger.info("Extracted skills from the job description's skills section")
+            return skills
+
+        skill_cache = _get_skill_cache()
+        key = hashlib.sha256(sanitized_jd.encode()).hexdigest()
+        skills, embedding = skill_cache.lookup(key, sanitized_jd)
+        if skills:
+            logger.info("Serving skills from skill cache")
+            return skills
 
-        result = self._generate_content(prompt)
+        prompt = _SKILLS_PROMPT.substitute(max_skills=MAX_SKILLS, job_description=sanitized_jd)
+        result = self._generate_content(prompt, generation_config=SKILLS_GENERATION_CONFIG)
         if not result:
             return None
 
-        # Parse numbered list into skills
-        skills = []
-        for line in result.split('\n'):
-            match = re.match(r'^\d+\.\s*(.+)$', line.strip())
-            if match and len(skills) < MAX_SKILLS:
-                skills.append(match.group(1))
-        
-        return skills if skills else None
+        skills = _parse_skill_list(result)
+        if skills:
+            skill_cache.store(key, skills, embedding)
+        return skills
 
-    def generate_custom_resume(self, resume: str, job_description: str, selected_skills: List[str]) -> Optional[str]:
-        """
-        Generate a tailored resume emphasizing selected skills.
-        Returns formatted resume text or None if failed.
-        """
+    @staticmethod
+    def _skills_focus(selected_skills: List[str]) -> str:
+        """Describe the user-selected skills for the generation prompts."""
+        return f"these {len(selected_skills)} key skills:\n{', '.join(selected_skills)}"
+
+    def _resume_request(self, resume: str, job_description: str,
+                        selected_skills: List[str]) -> Optional[Tuple[str, Optional[caching.CachedContent]]]:
+        """Build the tailored resume prompt and its context cache, or None if inputs are missing."""
+        resume = self._sanitize_input(resume)
+        job_description = self._sanitize_input(job_description)
         if not all([resume, job_description, selected_skills]):
             return None
 
-        prompt = f"""
-        Role: Expert Resume Writer specializing in ATS-optimized resumes
-        
-        Task: Transform this resume to perfectly match the target job by emphasizing these {len(selected_skills)} key skills:
-        {", ".join(selected_skills)}
-        
-        Guidelines:
-        1. STRUCTURE: Use standard resume sections (Summary, Skills, Experience, Education)
-        2. RELEVANCE: Prioritize experiences demonstrating selected skills
-        3. QUANTIFICATION: Add metrics to achievements where possible
-        4. KEYWORDS: Mirror language from the job description
-        5. CONCISENESS: Keep to 1-2 pages worth of content
-        6. FORMATTING: Use clean, professional formatting with bullet points
-        
-        Original Resume:
-        {self._sanitize_input(resume)}
-        
-        Target Job Description:
-        {self._sanitize_input(job_description)}
-        
-        Generate the optimized resume following these exact sections:
-        
-        [Professional Summary]
-        - 3-4 sentence career overview highlighting top qualifications
-        
-        [Key Skills]
-        - 6-8 bullet points mixing selected skills and job keywords
-        
-        [Professional Experience]
-        - For each role:
-          - Company, Job Title, Dates
-          - 3-5 bullet points emphasizing relevant achievements
-          - Start bullets with strong action verbs
-          - Include metrics (%, $, numbers) where possible
-        
-        [Education]
-        - Degree, Institution, Year
-        - Relevant coursework if entry-level
-        
-        [Optional Sections]
-        - Certifications, Projects, or Technical Skills if space allows
-        """
+        documents = self._format_documents(resume, job_description)
+        cached_content = self.prime_cache(documents)
+        prompt = _RESUME_PROMPT.substitute(
+            skills_focus=self._skills_focus(selected_skills),
+            documents=self._documents_section(documents, cached_content),
+        )
+        return prompt, cached_content
+
+    def _cover_letter_request(self, resume: str, job_description: str, selected_skills: List[str], company_name: str,
+                              recipient_name: str) -> Optional[Tuple[str, Optional[caching.CachedContent]]]:
+        """Build the cover letter prompt and its context cache, or None if inputs are missing."""
+        resume = self._sanitize_input(resume)
+        job_description = self._sanitize_input(job_description)
+        company_name = self._sanitize_input(company_name)
+        recipient_name = self._sanitize_input(recipient_name)
+        if not all([resume, job_description, selected_skills, company_name, recipient_name]):
+            return None
+
+        documents = self._format_documents(resume, job_description)
+        cached_content = self.prime_cache(documents)
+        prompt = _COVER_LETTER_PROMPT.substitute(
+            skills_focus=self._skills_focus(selected_skills),
+            documents=self._documents_section(documents, cached_content),
+            company_name=company_name,
+            recipient_name=recipient_name,
+        )
+        return prompt, cached_content
 
-        return self._generate_content(prompt)
+    def generate_custom_resume(self, resume: str, job_description: str, selected_skills: List[str],
+                               on_text: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        Generate a tailored resume emphasizing selected skills, streaming partial text to on_text.
+        Returns formatted resume text or None if failed.
+        """
+        request = self._resume_request(resume, job_description, selected_skills)
+        return self._generate_content(*request, on_text=on_text) if request else None
     
-    def generate_cover_letter(self, resume: str, job_description: str, selected_skills: List[str], company_name: str, recipient_name: str) -> Optional[str]:
+    def generate_cover_letter(self, resume: str, job_description: str, selected_skills: List[str], company_name: str, recipient_name: str,
+                              on_text: Optional[Callable[[str], None]] = None) -> Optional[str]:
         """
-        Generate a tailored cover letter emphasizing selected skills.
+        Generate a tailored cover letter emphasizing selected skills, streaming partial text to on_text.
         Returns formatted cover letter text or None if failed.
         """
-        if not all([resume, job_description, selected_skills, company_name, recipient_name]):
-            return None
+        request = self._cover_letter_request(resume, job_description, selected_skills, company_name, recipient_name)
+        return self._generate_content(*request, on_text=on_text) if request else None
 
-        prompt = f"""
-        Role: Expert Cover Letter Writer specializing in ATS-optimized cover letters
-        
-        Task: Craft a compelling cover letter to perfectly match the target job by emphasizing these {len(selected_skills)} key skills:
-        {", ".join(selected_skills)}
-        
-        Guidelines:
-        1. STRUCTURE: Use standard cover letter format (Introduction, Body, Conclusion)
-        2. RELEVANCE: Prioritize experiences demonstrating selected skills
-        3. QUANTIFICATION: Add metrics to achievements where possible
-        4. KEYWORDS: Mirror language from the job description
-        5. CONCISENESS: Keep to 1 page worth of content
-        6. FORMATTING: Use clean, professional formatting with paragraphs
-        7. PERSONALIZATION: Address the recipient by name and mention the company name
-        
-        Original Resume:
-        {self._sanitize_input(resume)}
-        
-        Target Job Description:
-        {self._sanitize_input(job_description)}
-        
-        Company Name:
-        {self._sanitize_input(company_name)}
-        
-        Recipient Name:
-        {self._sanitize_input(recipient_name)}
-        
-        Generate the optimized cover letter following these exact sections:
-        
-        [Introduction]
-        - Express enthusiasm for the role and company
-        - Briefly introduce yourself and highlight your key qualifications
-        
-        [Body]
-        - 2-3 paragraphs detailing relevant experiences and achievements
-        - Emphasize how your skills align with the job requirements
-        - Use specific examples and metrics to showcase your impact
-        
-        [Conclusion]
-        - Reiterate your interest and enthusiasm
-        - Thank the recipient for their time and consideration
-        - Express your eagerness to discuss your application further
-        
+    def generate_both(self, resume: str, job_description: str, selected_skills: List[str], company_name: str,
+                      recipient_name: str) -> Tuple[Optional[str], Optional[str]]:
         """
+        Generate the tailored resume and cover letter with concurrent API calls.
+        Returns (resume, cover_letter); either is None if failed.
+        """
+        requests = [
+            self._resume_request(resume, job_description, selected_skills),
+            self._cover_letter_request(resume, job_description, selected_skills, company_name, recipient_name),
+        ]
+        if not all(requests):
+            return None, None
+
+        # Cache access and UI errors stay on the script thread; workers only make the API calls
+        keys = [self._cache_key(prompt, cached_content) for prompt, cached_content in requests]
+        hits = [self._cached_response(key) for key in keys]
+        futures = [
+            None if hit is not None else _get_executor().submit(self._request_text, prompt, cached_content)
+            for (prompt, cached_content), hit in zip(requests, hits)
+        ]
+        return tuple(
+            hit if future is None else self._finish_request(key, future.result)
+            for key, hit, future in zip(keys, hits, futures)
+        )
+
+    def generate_bundle_batch(self, resume: str, job_description: str, company_name: str, recipient_name: str,
+                              on_state: Optional[Callable[[str], None]] = None) -> Optional[dict]:
+        """
+        Generate the skills, resume and cover letter in a single Gemini Batch API job.
+        Calls on_state with the job state name on every poll.
+        Returns a dict with "skills", "resume" and "cover_letter" or None if failed.
+        """
+        resume = self._sanitize_input(resume)
+        job_description = self._sanitize_input(job_description)
+        company_name = self._sanitize_input(company_name)
+        recipient_name = self._sanitize_input(recipient_name)
+        if not all([resume, job_description, company_name, recipient_name]):
+            return None
+
+        try:
+            from google import genai as genai_client
+        except ImportError:
+            st.error("Batch mode requires the google-genai package: pip install google-genai")
+            return None
+
+        documents = self._format_documents(resume, job_description)
+        prompts = [
+            _SKILLS_PROMPT.substitute(max_skills=MAX_SKILLS, job_description=job_description),
+            _RESUME_PROMPT.substitute(skills_focus=BATCH_SKILLS_FOCUS, documents=documents),
+            _COVER_LETTER_PROMPT.substitute(
+                skills_focus=BATCH_SKILLS_FOCUS,
+                documents=documents,
+                company_name=company_name,
+                recipient_name=recipient_name,
+            ),
+        ]
+        configs = [SKILLS_GENERATION_CONFIG, GENERATION_CONFIG, GENERATION_CONFIG]
+        requests = [
+            {
+                "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+                "config": {**config, "safety_settings": SAFETY_SETTINGS},
+            }
+            for prompt, config in zip(prompts, configs)
+        ]
+
+        try:
+            client = genai_client.Client(api_key=self.GOOGLE_API_KEY)
+            batch_job = client.batches.create(
+                model=f"models/{MODEL_NAME}",
+                src=requests,
+                config={"display_name": "resume-builder-bundle"},
+            )
+            state = batch_job.state.name
+            deadline = time.time() + BATCH_TIMEOUT
+            try:
+                while True:
+                    if on_state:
+                        on_state(state)
+                    if state in BATCH_TERMINAL_STATES:
+                        break
+                    if time.time() > deadline:
+                        logger.error(f"Batch job {batch_job.name} timed out")
+                        st.error("The batch job did not finish in time. Please try again.")
+                        return None
+                    time.sleep(BATCH_POLL_INTERVAL)
+                    batch_job = client.batches.get(name=batch_job.name)
+                    state = batch_job.state.name
+            finally:
+                # Also runs when a widget interaction stops the script mid-poll,
+                # so an abandoned job is not left running and billed
+                if state not in BATCH_TERMINAL_STATES:
+                    try:
+                        client.batches.cancel(name=batch_job.name)
+                    except Exception as e:
+                        logger.warning(f"Failed to cancel batch job {batch_job.name}: {str(e)}")
 
-        return self._generate_content(prompt)
+            if state != "JOB_STATE_SUCCEEDED":
+                logger.error(f"Batch job {batch_job.name} ended in state {state}: {batch_job.error}")
+                st.error("The batch job failed. Please try again.")
+                return None
+
+            texts = [item.response.text if item.response else None
+                     for item in batch_job.dest.inlined_responses]
+        except Exception as e:
+            logger.error(f"Error running batch job: {str(e)}")
+            st.error("An error occurred while generating content. Please try again.")
+            return None
+
+        if len(texts) != len(prompts) or not all(texts):
+            logger.error("Incomplete responses from Gemini batch job")
+            st.error("The batch job returned incomplete results. Please try again.")
+            return None
+
+        return {
+            "skills": _parse_skill_list(texts[0]),
+            "resume": texts[1],
+            "cover_letter": texts[2],
+        }
 
     @staticmethod
     def create_pdf(resume_text: str) -> bytes:
         """Generate PDF from resume text with error handling."""
         try:
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", size=11)
+            style = getSampleStyleSheet()["BodyText"].clone("Resume", fontName=_get_pdf_font(), fontSize=11, leading=14)
+            story = [
+                Paragraph(escape(line), style) if line.strip() else Spacer(1, style.leading)
+                for line in resume_text.splitlines()
+            ]
             
-            # Handle encoding and line breaks
-            text = resume_text.encode('latin-1', 'replace').decode('latin-1')
-            for line in text.split('\n'):
-                pdf.multi_cell(0, 5, line)
-                
-            return pdf.output(dest="S").encode("latin-1")
+            buffer = io.BytesIO()
+            SimpleDocTemplate(buffer, pagesize=LETTER).build(story)
+            return buffer.getvalue()
         except Exception as e:
             logger.error(f"PDF generation failed: {str(e)}")
             return None
 
-def create_download_link(file_data: bytes, filename: str) -> str:
-    """Create a download link for generated files."""
-    b64 = base64.b64encode(file_data).decode()
-    return f'<a href="data:application/octet-stream;base64,{b64}" download="{filename}">Download {filename}</a>'
+@st.cache_data(max_entries=32)
+def _parse_skill_list(llm_output: str) -> Optional[List[str]]:
+    """Parse the numbered skills list returned by Gemini."""
+    skills = []
+    for line in llm_output.splitlines():
+        match = _SKILL_LINE_RE.match(line)
+        if match:
+            skills.append(match.group(1))
+            if len(skills) == MAX_SKILLS:
+                break
+    
+    return skills if skills else None
+
+def _fast_extract_skills(job_description: str) -> Optional[List[str]]:
+    """
+    Read skills straight from bulleted Skills / Requirements / Qualifications sections.
+    Returns the first MAX_SKILLS bullets, or None unless the sections hold MAX_SKILLS to 2 * MAX_SKILLS of them.
+    """
+    lines = job_description.splitlines()
+    skills = []
+    for i, line in enumerate(lines):
+        if not _SKILLS_HEADING_RE.match(line):
+            continue
+        # Bullet block runs from the first bullet under the heading to the next blank or non-bullet line
+        in_block = False
+        for following in lines[i + 1:]:
+            match = _BULLET_RE.match(following)
+            if match:
+                in_block = True
+                if match.group(1) not in skills:
+                    skills.append(match.group(1))
+            elif following.strip() or in_block:
+                break
+
+    if MAX_SKILLS <= len(skills) <= 2 * MAX_SKILLS:
+        return skills[:MAX_SKILLS]
+    return None
+
+@st.cache_data(max_entries=32)
+def create_pdf_cached(text: str) -> Optional[bytes]:
+    """Build the PDF for a document once and reuse it across reruns."""
+    return ResumeBuilder.create_pdf(text)
+
+def _jd_key(job_description: str) -> str:
+    """Key for a job description in the session's skills_by_jd map."""
+    return hashlib.sha256(job_description.strip().encode()).hexdigest()
+
+def _get_skills(builder: ResumeBuilder, job_description: str) -> Optional[List[str]]:
+    """Extract skills for a job description once per session, shared by both tabs."""
+    key = _jd_key(job_description)
+    skills_by_jd = st.session_state.setdefault("skills_by_jd", {})
+    if key not in skills_by_jd:
+        skills = builder.extract_skills(job_description)
+        if not skills:
+            return None
+        skills_by_jd[key] = skills
+    return skills_by_jd[key]
+
+def _select_skills(skills: List[str], key_prefix: str) -> List[str]:
+    """Render the skills as a two-column checkbox grid and return the checked ones in rank order."""
+    # Create two columns for better skill display, filling each in one block
+    col1, col2 = st.columns(2)
+    checked = [False] * len(skills)
+    for col, start in ((col1, 0), (col2, 1)):
+        with col:
+            for i in range(start, len(skills), 2):
+                checked[i] = st.checkbox(skills[i], key=f"{key_prefix}_{i}", value=(i < 5))
+    return [skill for skill, selected in zip(skills, checked) if selected]
 
 def main_ui():
     """Main Streamlit UI implementation."""
@@ -249,8 +753,7 @@ def main_ui():
     )
     
     # Initialize session state
-    if 'skills' not in st.session_state:
-        st.session_state.skills = []
+    skills_by_jd = st.session_state.setdefault("skills_by_jd", {})
     if 'resume_generated' not in st.session_state:
         st.session_state.resume_generated = False
     if 'cover_letter_generated' not in st.session_state:
@@ -273,6 +776,9 @@ def main_ui():
     </style>
     """, unsafe_allow_html=True)
     
+    # The batch checkbox lives in the Cover Letter tab but also disables this tab's per-step buttons
+    batch_mode = st.session_state.get("batch_mode", False)
+    
     # Tabs for Resume and Cover Letter
     tab1, tab2 = st.tabs(["Resume Builder", "Cover Letter Builder"])
     
@@ -294,42 +800,43 @@ def main_ui():
                 key="job_description"  # Unique key
             )
             
-            if st.button("Analyze Job Requirements", type="primary"):
+            if batch_mode:
+                st.caption("Batch mode is on in the Cover Letter Builder tab; turn it off to analyze and generate here.")
+            
+            if st.button("Analyze Job Requirements", type="primary", disabled=batch_mode):
                 if not all([resume_text, job_description]):
                     st.warning("Please provide both resume and job description")
                 else:
                     with st.spinner(f"Identifying top {MAX_SKILLS} required skills..."):
-                        st.session_state.skills = builder.extract_skills(job_description)
+                        skills = _get_skills(builder, job_description)
                     
-                    if not st.session_state.skills:
+                    if not skills:
                         st.error("Failed to extract skills. Please try again.")
                     else:
                         st.session_state.resume_generated = False
         
         # Step 2: Skill Selection
-        if st.session_state.skills:
+        resume_skills = skills_by_jd.get(_jd_key(job_description))
+        if resume_skills:
             with st.expander("🎯 Step 2: Customize Skill Emphasis", expanded=True):
                 st.markdown("**Top Skills Identified:** (Select 3-6 to emphasize)")
                 
-                # Create two columns for better skill display
-                col1, col2 = st.columns(2)
-                selected_skills = []
-                
-                for i, skill in enumerate(st.session_state.skills):
-                    col = col1 if i % 2 == 0 else col2
-                    if col.checkbox(skill, key=f"skill_{i}", value=(i < 5)):
-                        selected_skills.append(skill)
+                selected_skills = _select_skills(resume_skills, "skill")
                 
-                if st.button("Generate Tailored Resume", type="primary"):
+                if st.button("Generate Tailored Resume", type="primary", disabled=batch_mode):
                     if len(selected_skills) < 3:
                         st.warning("Please select at least 3 skills for best results")
                     else:
+                        # Stream the draft here; Step 3 renders the finished resume
+                        preview = st.empty()
                         with st.spinner("Crafting your perfect resume..."):
                             custom_resume = builder.generate_custom_resume(
                                 resume_text,
                                 job_description,
-                                selected_skills
+                                selected_skills,
+                                on_text=preview.markdown
                             )
+                        preview.empty()
                         
                         if custom_resume:
                             st.session_state.custom_resume = custom_resume
@@ -343,10 +850,15 @@ def main_ui():
                 st.markdown(st.session_state.custom_resume)
                 
                 # PDF Generation
-                pdf_data = builder.create_pdf(st.session_state.custom_resume)
+                pdf_data = create_pdf_cached(st.session_state.custom_resume)
                 if pdf_data:
-                    st.markdown(create_download_link(pdf_data, "tailored_resume.pdf"), 
-                               unsafe_allow_html=True)
+                    st.download_button(
+                        "Download PDF",
+                        data=pdf_data,
+                        file_name="tailored_resume.pdf",
+                        mime="application/pdf",
+                        on_click="ignore"
+                    )
                 
                 # Improvement Tips
                 st.markdown("---")
@@ -361,6 +873,10 @@ def main_ui():
     with tab2:
         st.header("Cover Letter Builder")
         
+        # Set before a rerun that makes a resume generated here visible in the Resume Builder tab
+        if 'resume_notice' in st.session_state:
+            st.info(st.session_state.pop('resume_notice'))
+        
         # Step 1: Inputs
         with st.expander("📝 Step 1: Provide Your Information", expanded=True):
             cover_letter_resume_text = st.text_area(
@@ -387,44 +903,104 @@ def main_ui():
                 help="Enter the name of the hiring manager or recruiter"
             )
             
-            if st.button("Analyze Job Requirements for Cover Letter", type="primary"):
+            batch_mode = st.checkbox(
+                "Run in batch mode (cheaper, up to 15 min)",
+                help="Generate the resume and cover letter together at half the API cost; skills are chosen automatically",
+                key="batch_mode"
+            )
+            
+            if batch_mode:
+                if st.button("Generate Resume & Cover Letter (Batch)", type="primary"):
+                    if not all([cover_letter_resume_text, cover_letter_job_description, company_name, recipient_name]):
+                        st.warning("Please provide all required information")
+                    else:
+                        status = st.empty()
+                        with st.spinner("Waiting for the batch job to finish..."):
+                            bundle = builder.generate_bundle_batch(
+                                cover_letter_resume_text,
+                                cover_letter_job_description,
+                                company_name,
+                                recipient_name,
+                                on_state=lambda state: status.caption(f"Batch job state: {state}")
+                            )
+                        status.empty()
+                        
+                        if bundle:
+                            if bundle["skills"]:
+                                skills_by_jd[_jd_key(cover_letter_job_description)] = bundle["skills"]
+                            st.session_state.custom_resume = bundle["resume"]
+                            st.session_state.resume_generated = True
+                            st.session_state.custom_cover_letter = bundle["cover_letter"]
+                            st.session_state.cover_letter_generated = True
+                            st.session_state.resume_notice = "Your tailored resume is available in the Resume Builder tab."
+                            # The Resume Builder tab was drawn earlier in this run; rerun so it shows the new resume
+                            st.rerun()
+            elif st.button("Analyze Job Requirements for Cover Letter", type="primary"):
                 if not all([cover_letter_resume_text, cover_letter_job_description, company_name, recipient_name]):
                     st.warning("Please provide all required information")
                 else:
                     with st.spinner(f"Identifying top {MAX_SKILLS} required skills..."):
-                        st.session_state.skills = builder.extract_skills(cover_letter_job_description)
+                        skills = _get_skills(builder, cover_letter_job_description)
                     
-                    if not st.session_state.skills:
+                    if not skills:
                         st.error("Failed to extract skills. Please try again.")
                     else:
                         st.session_state.cover_letter_generated = False
         
         # Step 2: Skill Selection
-        if st.session_state.skills:
+        cover_letter_skills = skills_by_jd.get(_jd_key(cover_letter_job_description))
+        if cover_letter_skills and not batch_mode:
             with st.expander("🎯 Step 2: Customize Skill Emphasis", expanded=True):
                 st.markdown("**Top Skills Identified:** (Select 3-6 to emphasize)")
                 
-                # Create two columns for better skill display
-                col1, col2 = st.columns(2)
-                selected_skills = []
+                selected_skills = _select_skills(cover_letter_skills, "cover_letter_skill")
                 
-                for i, skill in enumerate(st.session_state.skills):
-                    col = col1 if i % 2 == 0 else col2
-                    if col.checkbox(skill, key=f"cover_letter_skill_{i}", value=(i < 5)):
-                        selected_skills.append(skill)
+                generate_cover_letter = st.button("Generate Tailored Cover Letter", type="primary")
+                generate_both = st.button("Generate Resume & Cover Letter Together")
                 
-                if st.button("Generate Tailored Cover Letter", type="primary"):
+                if generate_both:
                     if len(selected_skills) < 3:
                         st.warning("Please select at least 3 skills for best results")
                     else:
+                        with st.spinner("Crafting your resume and cover letter..."):
+                            custom_resume, custom_cover_letter = builder.generate_both(
+                                cover_letter_resume_text,
+                                cover_letter_job_description,
+                                selected_skills,
+                                company_name,
+                                recipient_name
+                            )
+                        
+                        if custom_cover_letter:
+                            st.session_state.custom_cover_letter = custom_cover_letter
+                            st.session_state.cover_letter_generated = True
+                        if custom_resume or custom_cover_letter:
+                            st.session_state.selected_skills = selected_skills
+                        if custom_resume:
+                            st.session_state.custom_resume = custom_resume
+                            st.session_state.resume_generated = True
+                            st.session_state.resume_notice = "Your tailored resume is available in the Resume Builder tab."
+                            if not custom_cover_letter:
+                                st.session_state.resume_notice += " The cover letter could not be generated. Please try again."
+                            # The Resume Builder tab was drawn earlier in this run; rerun so it shows the new resume
+                            st.rerun()
+                
+                if generate_cover_letter:
+                    if len(selected_skills) < 3:
+                        st.warning("Please select at least 3 skills for best results")
+                    else:
+                        # Stream the draft here; Step 3 renders the finished cover letter
+                        preview = st.empty()
                         with st.spinner("Crafting your perfect cover letter..."):
                             custom_cover_letter = builder.generate_cover_letter(
                                 cover_letter_resume_text,
                                 cover_letter_job_description,
                                 selected_skills,
                                 company_name,
-                                recipient_name
+                                recipient_name,
+                                on_text=preview.markdown
                             )
+                        preview.empty()
                         
                         if custom_cover_letter:
                             st.session_state.custom_cover_letter = custom_cover_letter
@@ -438,10 +1014,15 @@ def main_ui():
                 st.markdown(st.session_state.custom_cover_letter)
                 
                 # PDF Generation
-                pdf_data = builder.create_pdf(st.session_state.custom_cover_letter)
+                pdf_data = create_pdf_cached(st.session_state.custom_cover_letter)
                 if pdf_data:
-                    st.markdown(create_download_link(pdf_data, "tailored_cover_letter.pdf"), 
-                               unsafe_allow_html=True)
+                    st.download_button(
+                        "Download PDF",
+                        data=pdf_data,
+                        file_name="tailored_cover_letter.pdf",
+                        mime="application/pdf",
+                        on_click="ignore"
+                    )
                 
                 # Improvement Tips
                 st.markdown("---")